@@ -0,0 +1,7 @@
+-- One-time DDL: maintain churn as a stored generated TINYINT so the
+-- dashboard reads an int8 column directly instead of re-deriving it
+-- from the churn_status string on every load. The index lets MySQL
+-- resolve churn-based aggregates without scanning the strings.
+ALTER TABLE churn_outcomes
+    ADD COLUMN churn_int TINYINT AS (churn_status = 'Yes') STORED,
+    ADD INDEX (churn_int);
@@ -1,41 +1,215 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+from sqlalchemy import bindparam, text
 from utils.connection_utils import get_mysql_connection
 
+# Arrow-backed strings: one contiguous buffer + offsets instead of a
+# Python object per cell, so the string-heavy frame is far smaller and
+# isin/groupby run on arrow kernels.
+pd.options.mode.string_storage = "pyarrow"
+
 # --- Streamlit Page Settings ---
 st.set_page_config(page_title="Customer Churn Dashboard", layout="wide")
 
 # --- Title ---
 st.title("📊 Customer Churn Analysis Dashboard")
 
-# --- Cached DB Loader ---
-@st.cache_data
-def load_data():
-    """Load and merge all churn-related tables"""
+# --- Cached Filtered Loader ---
+@st.cache_data(ttl=300)
+def load_filtered(genders, contracts, churn_statuses, tenure_range, revenue_range):
+    """Fetch only the rows matching the sidebar filters.
+
+    The WHERE clause runs server-side with bound parameters, so the wire
+    carries just the selected rows instead of the whole joined table
+    being filtered again in pandas on every rerun."""
     try:
-        conn = get_mysql_connection()
-        customers = pd.read_sql("SELECT * FROM customers", conn)
-        services = pd.read_sql("SELECT * FROM services", conn)
-        billing = pd.read_sql("SELECT * FROM billing", conn)
-        churn = pd.read_sql("SELECT * FROM churn_outcomes", conn)
-        conn.dispose()
-
-        # Merge all tables
-        df = (
-            customers
-            .merge(services, on="customer_id", how="left")
-            .merge(billing, on="customer_id", how="left")
-            .merge(churn, on="customer_id", how="left")
+        query = text("""
+            SELECT c.*,
+                   s.phone_service, s.multiple_lines, s.internet_service,
+                   s.online_security, s.online_backup, s.device_protection,
+                   s.tech_support, s.streaming_tv, s.streaming_movies,
+                   b.contract, b.paperless_billing, b.payment_method,
+                   b.monthly_charges, b.total_charges,
+                   ch.churn_status, ch.churn_date, ch.churn_int
+            FROM customers c
+            LEFT JOIN services s USING (customer_id)
+            LEFT JOIN billing b USING (customer_id)
+            LEFT JOIN churn_outcomes ch USING (customer_id)
+            WHERE c.gender IN :g
+              AND b.contract IN :con
+              AND ch.churn_status IN :ch
+              AND c.tenure BETWEEN :tlo AND :thi
+              AND b.monthly_charges BETWEEN :rlo AND :rhi
+        """).bindparams(
+            bindparam("g", expanding=True),
+            bindparam("con", expanding=True),
+            bindparam("ch", expanding=True),
         )
+
+        conn = get_mysql_connection()
+        df = pd.read_sql(query, conn, params={
+            "g": list(genders),
+            "con": list(contracts),
+            "ch": list(churn_statuses),
+            "tlo": tenure_range[0], "thi": tenure_range[1],
+            "rlo": revenue_range[0], "rhi": revenue_range[1],
+        }, dtype_backend="pyarrow")
+
+        # Category dtype stores these low-cardinality string columns as int
+        # codes — the isin filters and groupbys below then work on codes
+        # instead of Python strings.
+        cat_cols = [
+            "gender", "contract", "churn_status", "payment_method",
+            "internet_service", "multiple_lines", "online_security",
+            "online_backup", "device_protection", "tech_support",
+            "streaming_tv", "streaming_movies", "phone_service",
+            "paperless_billing"
+        ]
+        for c in cat_cols:
+            df[c] = df[c].astype("category")
+
+        # churn_int arrives from MySQL as the stored generated column
+        # (see sql/schema.sql), so no per-load string compare is needed.
+
+        # Downcast the numerics — halves the bytes every later
+        # groupby/mean/sum moves and shrinks the cached pickle
+        df["tenure"] = pd.to_numeric(df["tenure"], downcast="unsigned")
+        df["monthly_charges"] = df["monthly_charges"].astype("float32")
+        df["total_charges"] = df["total_charges"].astype("float32")
+
         return df
     except Exception as e:
         st.error(f"❌ Database connection failed: {e}")
         st.stop()
 
-# Load data
+# --- Cached Filter Options ---
+@st.cache_data(ttl=300)
+def load_filter_options():
+    """Fetch the sidebar widget inputs with small per-column queries.
+
+    Distinct values and numeric ranges come straight from MySQL, so the
+    full joined table never has to travel just to populate the form. The
+    overall monthly-charges median (MySQL has no MEDIAN()) is computed
+    from a single slim column read."""
+    try:
+        conn = get_mysql_connection()
+        genders = pd.read_sql(
+            "SELECT DISTINCT gender FROM customers WHERE gender IS NOT NULL",
+            conn)["gender"].tolist()
+        contracts = pd.read_sql(
+            "SELECT DISTINCT contract FROM billing WHERE contract IS NOT NULL",
+            conn)["contract"].tolist()
+        churn_statuses = pd.read_sql(
+            "SELECT DISTINCT churn_status FROM churn_outcomes WHERE churn_status IS NOT NULL",
+            conn)["churn_status"].tolist()
+        ranges = pd.read_sql(
+            """
+            SELECT MIN(c.tenure) AS tenure_min, MAX(c.tenure) AS tenure_max,
+                   MIN(b.monthly_charges) AS charges_min,
+                   MAX(b.monthly_charges) AS charges_max
+            FROM customers c
+            LEFT JOIN billing b USING (customer_id)
+            """,
+            conn).iloc[0]
+        median_charges = float(
+            pd.read_sql("SELECT monthly_charges FROM billing", conn)["monthly_charges"].median()
+        )
+        return genders, contracts, churn_statuses, ranges, median_charges
+    except Exception as e:
+        st.error(f"❌ Database connection failed: {e}")
+        st.stop()
+
+# --- Cached KPI Loader ---
+@st.cache_data(ttl=300)
+def load_kpis(genders, contracts, churn_statuses, tenure_range, revenue_range,
+              high_risk_only, premium_threshold):
+    """Compute the Executive Summary KPIs server-side.
+
+    MySQL reduces the filtered rows to one row of scalars, so the full
+    table never travels for the metric cards."""
+    try:
+        where = """
+            c.gender IN :g
+            AND b.contract IN :con
+            AND ch.churn_status IN :ch
+            AND c.tenure BETWEEN :tlo AND :thi
+            AND b.monthly_charges BETWEEN :rlo AND :rhi
+        """
+        if high_risk_only:
+            where += " AND c.tenure < 6 AND ch.churn_int = 1"
+
+        # churn_int is the indexed generated column (sql/schema.sql), so the
+        # aggregates sum a TINYINT instead of comparing strings per row
+        query = text(f"""
+            SELECT COUNT(DISTINCT c.customer_id)                 AS total_customers,
+                   SUM(ch.churn_int)                             AS churned_customers,
+                   AVG(c.tenure)                                 AS avg_tenure,
+                   SUM(CASE WHEN ch.churn_int = 1
+                            THEN b.monthly_charges END) * 12     AS revenue_at_risk,
+                   SUM(c.tenure < 3 AND ch.churn_int = 1)        AS high_risk_count,
+                   SUM(b.monthly_charges > :premium)             AS premium_count,
+                   SUM(c.tenure > 24)                            AS loyal_count
+            FROM customers c
+            LEFT JOIN billing b USING (customer_id)
+            LEFT JOIN churn_outcomes ch USING (customer_id)
+            WHERE {where}
+        """).bindparams(
+            bindparam("g", expanding=True),
+            bindparam("con", expanding=True),
+            bindparam("ch", expanding=True),
+        )
+
+        conn = get_mysql_connection()
+        kpis = pd.read_sql(query, conn, params={
+            "g": list(genders),
+            "con": list(contracts),
+            "ch": list(churn_statuses),
+            "tlo": tenure_range[0], "thi": tenure_range[1],
+            "rlo": revenue_range[0], "rhi": revenue_range[1],
+            "premium": premium_threshold,
+        }).iloc[0]
+        return kpis
+    except Exception as e:
+        st.error(f"❌ Database connection failed: {e}")
+        st.stop()
+
+# --- Cached Revenue Aggregations (Tab 2) ---
+@st.cache_data(ttl=300, show_spinner=False)
+def revenue_aggregates(_df, filter_key):
+    """Aggregate Tab 2's revenue views once per filter selection.
+
+    _df is excluded from the cache key; filter_key (the sidebar
+    selections) identifies the filtered frame, so reruns that only touch
+    other widgets skip both groupbys."""
+    df_funnel = _df.groupby('churn_status', observed=True)['monthly_charges'].sum().reset_index()
+    # monthly_charges * churn_int zeroes out retained customers, so the
+    # churned-revenue sum is one C-level multiply + groupby instead of a
+    # Python lambda with a boolean mask per group. observed=True keeps
+    # the category dtype from emitting empty filtered-out groups.
+    df_rev = (
+        _df.assign(churned_monthly=_df['monthly_charges'] * _df['churn_int'])
+        .groupby('contract', observed=True)
+        .agg(
+            total_revenue=('monthly_charges', 'sum'),
+            churned_revenue=('churned_monthly', 'sum')
+        )
+        .reset_index()
+    )
+    return df_funnel, df_rev
+
+# --- Cached CSV Export (Tab 4) ---
+@st.cache_data(ttl=300, show_spinner=False)
+def export_csv(_df, filter_key):
+    """Serialize the filtered frame once per filter selection.
+
+    The download payload used to be rebuilt on every rerun even though
+    users rarely download; now the stringify pass runs once per key."""
+    return _df.to_csv(index=False).encode('utf-8')
+
+# Load the sidebar inputs
 with st.spinner("Loading data from database..."):
-    df = load_data()
+    gender_options, contract_options, churn_options, ranges, median_charges = load_filter_options()
 
 # --- Sidebar Filters ---
 st.sidebar.header("Filters")
@@ -43,36 +217,36 @@ st.sidebar.header("Filters")
 with st.sidebar.form("filter_form"):
     gender_filter = st.multiselect(
         "Gender",
-        options=df["gender"].dropna().unique(),
-        default=df["gender"].dropna().unique()
+        options=gender_options,
+        default=gender_options
     )
 
     contract_filter = st.multiselect(
         "Contract Type",
-        options=df["contract"].dropna().unique(),
-        default=df["contract"].dropna().unique()
+        options=contract_options,
+        default=contract_options
     )
 
     churn_filter = st.multiselect(
         "Churn Status",
-        options=df["churn_status"].dropna().unique(),
-        default=df["churn_status"].dropna().unique()
+        options=churn_options,
+        default=churn_options
     )
 
     st.markdown("### 🔍 Advanced Filters")
 
     tenure_filter = st.slider(
         "Tenure (months)",
-        min_value=int(df['tenure'].min()),
-        max_value=int(df['tenure'].max()),
-        value=(0, int(df['tenure'].max()))
+        min_value=int(ranges['tenure_min']),
+        max_value=int(ranges['tenure_max']),
+        value=(0, int(ranges['tenure_max']))
     )
 
     revenue_filter = st.slider(
         "Monthly Charges Range",
-        min_value=float(df['monthly_charges'].min()),
-        max_value=float(df['monthly_charges'].max()),
-        value=(0.0, float(df['monthly_charges'].max()))
+        min_value=float(ranges['charges_min']),
+        max_value=float(ranges['charges_max']),
+        value=(0.0, float(ranges['charges_max']))
     )
 
     high_risk_toggle = st.checkbox("Show Only High-Risk Customers")
@@ -91,30 +265,38 @@ This dashboard provides strategic insights into customer churn patterns.
 if apply_filters or not st.session_state.get('filters_applied', False):
     st.session_state.filters_applied = True
 
-    df_filtered = df[
-        (df["gender"].isin(gender_filter)) &
-        (df["contract"].isin(contract_filter)) &
-        (df["churn_status"].isin(churn_filter)) &
-        (df["tenure"].between(tenure_filter[0], tenure_filter[1])) &
-        (df["monthly_charges"].between(revenue_filter[0], revenue_filter[1]))
-    ]
+    df_filtered = load_filtered(
+        tuple(gender_filter), tuple(contract_filter), tuple(churn_filter),
+        tenure_filter, revenue_filter
+    )
 
     if high_risk_toggle:
         df_filtered = df_filtered[
             (df_filtered['tenure'] < 6) & (df_filtered['churn_status'] == 'Yes')
         ]
 
+    # One hashable key identifying the current filter selection, used by
+    # the cached per-filter aggregations below.
+    filter_key = (tuple(gender_filter), tuple(contract_filter), tuple(churn_filter),
+                  tenure_filter, revenue_filter, high_risk_toggle)
+
     # --- Executive Summary ---
     st.markdown("## 🎯 Executive Summary")
 
-    total_customers = df_filtered["customer_id"].nunique()
-    churned_customers = (df_filtered["churn_status"] == "Yes").sum()
+    kpis = load_kpis(
+        tuple(gender_filter), tuple(contract_filter), tuple(churn_filter),
+        tenure_filter, revenue_filter, high_risk_toggle,
+        median_charges
+    )
+
+    total_customers = int(kpis['total_customers'])
+    churned_customers = int(kpis['churned_customers'] or 0)
     churn_rate = (churned_customers / total_customers * 100) if total_customers > 0 else 0
-    revenue_at_risk = df_filtered[df_filtered['churn_status']=='Yes']['monthly_charges'].sum() * 12
-    high_risk_count = df_filtered[(df_filtered['tenure']<3) & (df_filtered['churn_status']=='Yes')].shape[0]
-    avg_tenure = df_filtered['tenure'].mean()
-    premium_count = df_filtered[df_filtered['monthly_charges'] > df['monthly_charges'].median()].shape[0]
-    loyal_count = df_filtered[df_filtered['tenure']>24].shape[0]
+    revenue_at_risk = float(kpis['revenue_at_risk'] or 0)
+    high_risk_count = int(kpis['high_risk_count'] or 0)
+    avg_tenure = float(kpis['avg_tenure']) if kpis['avg_tenure'] is not None else float('nan')
+    premium_count = int(kpis['premium_count'] or 0)
+    loyal_count = int(kpis['loyal_count'] or 0)
 
     col1, col2, col3, col4 = st.columns(4)
     col1.metric("Total Customers", f"{total_customers:,}", help="Total customers matching filters")
@@ -158,8 +340,7 @@ if apply_filters or not st.session_state.get('filters_applied', False):
             st.plotly_chart(fig_contract, use_container_width=True)
 
         st.markdown("### 🔥 Top Churn Predictors")
-        churn_numeric = df_filtered['churn_status'].map({'Yes':1, 'No':0})
-        corr_matrix = df_filtered[['tenure', 'monthly_charges', 'senior_citizen']].corrwith(churn_numeric)
+        corr_matrix = df_filtered[['tenure', 'monthly_charges', 'senior_citizen']].corrwith(df_filtered['churn_int'])
         fig_corr = px.bar(corr_matrix, orientation='h', color=corr_matrix,
                           color_continuous_scale='RdBu', range_color=[-1,1])
         st.plotly_chart(fig_corr, use_container_width=True)
@@ -168,16 +349,13 @@ if apply_filters or not st.session_state.get('filters_applied', False):
     with tab2:
         st.markdown("### 💰 Revenue Impact Analysis")
 
+        df_funnel, df_rev = revenue_aggregates(df_filtered, filter_key)
+
         # Revenue Funnel
-        df_funnel = df_filtered.groupby('churn_status')['monthly_charges'].sum().reset_index()
         fig_funnel = px.funnel(df_funnel, x='monthly_charges', y='churn_status')
         st.plotly_chart(fig_funnel, use_container_width=True)
 
         # Revenue by Contract (from filtered df, no SQL needed)
-        df_rev = df_filtered.groupby('contract').agg(
-            total_revenue=('monthly_charges','sum'),
-            churned_revenue=('monthly_charges', lambda x: x[df_filtered['churn_status']=='Yes'].sum())
-        ).reset_index()
         fig_rev = px.bar(df_rev, x='contract', y=['total_revenue', 'churned_revenue'],
                          barmode='group', text_auto='.2s')
         st.plotly_chart(fig_rev, use_container_width=True)
@@ -185,10 +363,10 @@ if apply_filters or not st.session_state.get('filters_applied', False):
     # ✅ TAB 3: CLV Analysis
     with tab3:
         st.markdown("### 📈 Customer Lifetime Value")
-        df_clv = df_filtered.groupby('contract').agg(
+        df_clv = df_filtered.groupby('contract', observed=True).agg(
             avg_clv=('total_charges','mean'),
             customers=('customer_id','count'),
-            churned=('churn_status', lambda x: (x=='Yes').sum())
+            churned=('churn_int','sum')
         ).reset_index()
         fig_clv = px.scatter(df_clv, x='avg_clv', y='customers', size='churned',
                              color='contract', hover_name='contract',
@@ -199,9 +377,12 @@ if apply_filters or not st.session_state.get('filters_applied', False):
     # ✅ TAB 4: Raw Data
     with tab4:
         st.markdown("### 🔎 Filtered Data Preview")
-        st.dataframe(df_filtered)
-        csv = df_filtered.to_csv(index=False).encode('utf-8')
-        st.download_button("⬇️ Download CSV", data=csv,
+        # Preview the first 500 rows only — the full frame is still
+        # available through the download below
+        st.dataframe(df_filtered.head(500))
+        if len(df_filtered) > 500:
+            st.caption(f"Showing first 500 of {len(df_filtered):,} filtered rows")
+        st.download_button("⬇️ Download CSV", data=export_csv(df_filtered, filter_key),
                            file_name="churn_analysis.csv", mime='text/csv')
 
 else:
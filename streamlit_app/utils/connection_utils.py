@@ -2,31 +2,44 @@ import streamlit as st
 import os
 from sqlalchemy import create_engine
 
+def get_db_config():
+    """Return MySQL settings from Streamlit Cloud secrets or local .env"""
+
+    # ✅ 1. Try secrets on Streamlit Cloud
+    if "mysql" in st.secrets:
+        return dict(st.secrets["mysql"])
+
+    # ✅ 2. Fallback for local .env
+    from dotenv import load_dotenv
+    load_dotenv()
+    return {
+        "host": os.getenv("DB_HOST"),
+        "port": os.getenv("DB_PORT"),
+        "user": os.getenv("DB_USER"),
+        "password": os.getenv("DB_PASSWORD"),
+        "database": os.getenv("DB_NAME"),
+    }
+
+@st.cache_resource
 def get_mysql_connection():
-    """Create a MySQL connection for Streamlit Cloud or local .env"""
+    """Return the shared pooled MySQL engine (Streamlit Cloud or local .env)
+
+    cache_resource keeps one engine alive for the whole app, so reruns
+    reuse pooled connections instead of paying the TCP + auth handshake
+    on every query. pool_pre_ping revives connections Railway drops."""
 
     try:
-        # ✅ 1. Try secrets on Streamlit Cloud
-        if "mysql" in st.secrets:
-            db_config = st.secrets["mysql"]
-        else:
-            # ✅ 2. Fallback for local .env
-            from dotenv import load_dotenv
-            load_dotenv()
-            db_config = {
-                "host": os.getenv("DB_HOST"),
-                "port": os.getenv("DB_PORT"),
-                "user": os.getenv("DB_USER"),
-                "password": os.getenv("DB_PASSWORD"),
-                "database": os.getenv("DB_NAME"),
-            }
-
-        # ✅ Build connection string
+        db_config = get_db_config()
+
+        # ✅ Build connection string — mysqldb (mysqlclient) does packet
+        # parsing in C, noticeably faster than pymysql on bulk fetches
         connection_url = (
-            f"mysql+pymysql://{db_config['user']}:{db_config['password']}"
+            f"mysql+mysqldb://{db_config['user']}:{db_config['password']}"
             f"@{db_config['host']}:{db_config['port']}/{db_config['database']}"
+            "?charset=utf8mb4"
         )
-        return create_engine(connection_url)
+        return create_engine(connection_url, pool_size=5,
+                             pool_pre_ping=True, pool_recycle=1800)
 
     except Exception as e:
         st.error(f"❌ Database connection failed: {e}")